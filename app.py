@@ -1,172 +1,363 @@
-from flask import Flask, render_template, request, redirect, url_for, flash
-from models import db, Event, Resource, EventResourceAllocation
-from datetime import datetime
-from sqlalchemy import and_, or_
+from flask import Flask, render_template, request, redirect, url_for, flash, session
+from flask_caching import Cache
+from models import (db, Event, Resource, EventResourceAllocation, DashboardStats,
+                    add_booked_seconds, booked_seconds, count_conflicts_query,
+                    extend_longest_booking, rebuild_booking_aggregates,
+                    refresh_conflicts_count)
+from jinja2 import FileSystemBytecodeCache
+from datetime import datetime, timedelta
+import heapq
+from itertools import groupby
+import warnings
+from sqlalchemy import and_, or_, func, inspect, lambda_stmt, select, text, update
+from sqlalchemy.orm import aliased, selectinload
+
+try:
+    from ciso8601 import parse_datetime as parse_dt
+except ImportError:
+    parse_dt = datetime.fromisoformat
+
+try:
+    import numpy as np
+    from numba import njit
+except ImportError:
+    np = None
+    njit = None
+    warnings.warn('numba is not installed; conflict detection uses the pure-Python sweep.')
 
 app = Flask(__name__)
 app.config['SECRET_KEY'] = 'your-secret-key-change-in-production'
 app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///db.sqlite3'
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+app.config['SQLALCHEMY_ENGINE_OPTIONS'] = {'query_cache_size': 1200}
 
 db.init_app(app)
+cache = Cache(app, config={'CACHE_TYPE': 'SimpleCache'})
 
-def times_overlap(start1, end1, start2, end2):
-    return start1 < end2 and start2 < end1
+# Compiled templates survive restarts; auto_reload already follows app.debug.
+# Jinja's default per-user directory is created 0700 and ownership-checked.
+app.jinja_env.bytecode_cache = FileSystemBytecodeCache()
 
-def check_resource_conflict(resource_id, start_time, end_time, exclude_event_id=None):
-    conflicts = []
-    allocations = EventResourceAllocation.query.filter_by(resource_id=resource_id).all()
-    for allocation in allocations:
-        if exclude_event_id and allocation.event_id == exclude_event_id:
-            continue
-        event = allocation.event
-        if times_overlap(start_time, end_time, event.start_time, event.end_time):
-            conflicts.append(event)
-    return conflicts
+UPCOMING_BOOKINGS_LIMIT = 3
+
+EPOCH = datetime(1970, 1, 1)
+MICROSECOND = timedelta(microseconds=1)
+
+load_event_allocations = selectinload(Event.allocations).selectinload(EventResourceAllocation.resource)
+
+def epoch_micros(dt):
+    return (dt - EPOCH) // MICROSECOND
+
+def _find_conflicts(starts, ends):
+    # Sweep line over intervals sorted by start: the heap holds (end, index)
+    # of intervals still running, so every entry left after popping the
+    # finished ones overlaps interval j. The sliced literals give numba a
+    # typed empty list to infer from.
+    pairs = [(0, 0)][:0]
+    active = [(0, 0)][:0]
+    for j in range(len(starts)):
+        while active and active[0][0] <= starts[j]:
+            heapq.heappop(active)
+        for _, i in active:
+            pairs.append((i, j))
+        heapq.heappush(active, (ends[j], j))
+    return pairs
+
+if njit is not None:
+    _find_conflicts = njit(cache=True)(_find_conflicts)
+
+def earliest_overlapping_start(start_time):
+    # SQL lower bound on the start of any booking of the joined resource
+    # that can still be running at start_time.
+    return func.datetime(start_time, func.printf('-%d seconds', Resource.longest_booking_seconds))
+
+def iter_resource_conflicts(resource_ids, start_time, end_time, exclude_event_id=None):
+    # Built as a lambda statement so SQLAlchemy caches the compiled SQL
+    # and only the bound parameters change between calls.
+    stmt = lambda_stmt(lambda: select(EventResourceAllocation.resource_id, Event).join(
+        Event, EventResourceAllocation.event_id == Event.id
+    ).join(
+        Resource, Resource.id == EventResourceAllocation.resource_id
+    ))
+    stmt += lambda s: s.where(
+        EventResourceAllocation.resource_id.in_(resource_ids),
+        EventResourceAllocation.start_time > earliest_overlapping_start(start_time),
+        EventResourceAllocation.start_time < end_time,
+        EventResourceAllocation.end_time > start_time
+    )
+    if exclude_event_id:
+        stmt += lambda s: s.where(EventResourceAllocation.event_id != exclude_event_id)
+    stmt += lambda s: s.order_by(
+        EventResourceAllocation.resource_id, EventResourceAllocation.start_time
+    )
+    # Stream rows so callers that stop early never fetch the rest.
+    result = db.session.execute(stmt, execution_options={'yield_per': 100})
+    try:
+        for resource_id, event in result:
+            yield resource_id, event
+    finally:
+        result.close()
+
+def check_resource_conflicts_bulk(resource_ids, start_time, end_time, exclude_event_id=None):
+    rows = iter_resource_conflicts(resource_ids, start_time, end_time, exclude_event_id)
+    return {
+        resource_id: [event for _, event in group]
+        for resource_id, group in groupby(rows, key=lambda row: row[0])
+    }
+
+def has_resource_conflict(resource_ids, start_time, end_time, exclude_event_id=None):
+    query = db.session.query(EventResourceAllocation.id).join(
+        Resource, Resource.id == EventResourceAllocation.resource_id
+    ).filter(
+        EventResourceAllocation.resource_id.in_(resource_ids),
+        EventResourceAllocation.start_time > earliest_overlapping_start(start_time),
+        EventResourceAllocation.start_time < end_time,
+        EventResourceAllocation.end_time > start_time
+    )
+    if exclude_event_id:
+        query = query.filter(EventResourceAllocation.event_id != exclude_event_id)
+    return query.first() is not None
 
 def validate_event_times(start_time, end_time):
     if start_time >= end_time:
         return False, "End time must be after start time. Events with zero duration are not allowed."
     return True, None
 
+def parse_and_validate(start_time_str, end_time_str):
+    try:
+        start_time = parse_dt(start_time_str)
+        end_time = parse_dt(end_time_str)
+    except ValueError:
+        return None, None, 'Invalid date/time format.'
+    is_valid, error_msg = validate_event_times(start_time, end_time)
+    if not is_valid:
+        return None, None, error_msg
+    return start_time, end_time, None
+
+def _parse_event_form(form):
+    title = form.get('title', '').strip()
+    description = form.get('description', '').strip()
+    start_time_str = form.get('start_time', '')
+    end_time_str = form.get('end_time', '')
+    if not title or not start_time_str or not end_time_str:
+        return 'error', 'Please fill in all required fields.'
+    start_time, end_time, error_msg = parse_and_validate(start_time_str, end_time_str)
+    if error_msg:
+        return 'error', error_msg
+    return 'ok', dict(title=title, description=description,
+                      start_time=start_time, end_time=end_time)
+
+def load_resource_schedule():
+    rows = db.session.query(Resource, Event).join(
+        EventResourceAllocation, EventResourceAllocation.resource_id == Resource.id
+    ).join(
+        Event, EventResourceAllocation.event_id == Event.id
+    ).order_by(Resource.id, EventResourceAllocation.start_time).all()
+    return {
+        resource.id: (resource, [event for _, event in group])
+        for resource, group in groupby(rows, key=lambda row: row[0])
+    }
+
+def load_event_listing():
+    duration_hours = (func.julianday(Event.end_time) - func.julianday(Event.start_time)) * 24
+    events = db.session.execute(db.select(
+        Event.id, Event.title, Event.description, Event.start_time, Event.end_time,
+        duration_hours.label('duration_hours')
+    ).order_by(Event.start_time)).mappings().all()
+    rows = db.session.execute(db.select(
+        EventResourceAllocation.event_id, EventResourceAllocation.id,
+        Resource.name.label('resource_name'), Resource.type.label('resource_type')
+    ).join(
+        Resource, EventResourceAllocation.resource_id == Resource.id
+    ).order_by(EventResourceAllocation.event_id, EventResourceAllocation.id)).mappings().all()
+    allocations = {
+        event_id: list(group)
+        for event_id, group in groupby(rows, key=lambda row: row['event_id'])
+    }
+    return events, allocations
+
+def load_resource_listing():
+    return db.session.execute(db.select(
+        Resource.id, Resource.name, Resource.type,
+        func.count(EventResourceAllocation.id).label('booking_count')
+    ).outerjoin(
+        EventResourceAllocation, EventResourceAllocation.resource_id == Resource.id
+    ).group_by(Resource.id).order_by(Resource.type, Resource.name)).mappings().all()
+
+@cache.memoize(timeout=30)
 def get_all_conflicts():
     conflicts = []
-    resources = Resource.query.all()
-    for resource in resources:
-        allocations = EventResourceAllocation.query.filter_by(resource_id=resource.id).all()
-        events = [a.event for a in allocations]
-        for i in range(len(events)):
-            for j in range(i + 1, len(events)):
-                event1 = events[i]
-                event2 = events[j]
-                if times_overlap(event1.start_time, event1.end_time,
-                                 event2.start_time, event2.end_time):
-                    conflicts.append({
-                        'resource': resource,
-                        'event1': event1,
-                        'event2': event2
-                    })
+    for resource, events in load_resource_schedule().values():
+        # Integer timestamps keep the sweep's comparisons off datetime.__lt__.
+        starts = [epoch_micros(event.start_time) for event in events]
+        ends = [epoch_micros(event.end_time) for event in events]
+        if np is not None:
+            starts = np.array(starts, dtype=np.int64)
+            ends = np.array(ends, dtype=np.int64)
+        for i, j in _find_conflicts(starts, ends):
+            conflicts.append({
+                'resource': resource,
+                'event1': events[i],
+                'event2': events[j]
+            })
     return conflicts
 
-def get_resource_utilization(resource, start_date, end_date):
-    allocations = EventResourceAllocation.query.filter_by(resource_id=resource.id).all()
-    total_hours = 0
-    upcoming_bookings = []
-    now = datetime.now()
-    for allocation in allocations:
-        event = allocation.event
-        event_start = max(event.start_time, start_date)
-        event_end = min(event.end_time, end_date)
-        if event_start < event_end:
-            hours = (event_end - event_start).total_seconds() / 3600
-            total_hours += hours
-        if event.start_time > now:
-            upcoming_bookings.append(event)
-    upcoming_bookings.sort(key=lambda e: e.start_time)
+def count_conflicts():
+    return db.session.scalar(count_conflicts_query())
+
+def get_dashboard_stats():
+    stats = db.session.get(DashboardStats, 1)
+    if stats is None:
+        stats = refresh_dashboard_stats()
+    return stats
+
+def refresh_dashboard_stats():
+    stats = db.session.get(DashboardStats, 1) or DashboardStats(id=1)
+    stats.events_count, stats.resources_count = db.session.query(
+        select(func.count(Event.id)).scalar_subquery(),
+        select(func.count(Resource.id)).scalar_subquery()
+    ).one()
+    stats.conflicts_count = count_conflicts()
+    db.session.add(stats)
+    db.session.commit()
+    return stats
+
+def get_upcoming_bookings(now, limit=UPCOMING_BOOKINGS_LIMIT):
+    ranked = select(
+        EventResourceAllocation.resource_id,
+        EventResourceAllocation.event_id,
+        func.row_number().over(
+            partition_by=EventResourceAllocation.resource_id,
+            order_by=EventResourceAllocation.start_time
+        ).label('position')
+    ).where(EventResourceAllocation.start_time > now).subquery()
+    rows = db.session.query(ranked.c.resource_id, Event).join(
+        Event, Event.id == ranked.c.event_id
+    ).filter(
+        ranked.c.position <= limit
+    ).order_by(ranked.c.resource_id, ranked.c.position).all()
     return {
-        'resource': resource,
-        'total_hours': round(total_hours, 2),
-        'upcoming_bookings': upcoming_bookings
+        resource_id: [event for _, event in group]
+        for resource_id, group in groupby(rows, key=lambda row: row[0])
     }
 
+@cache.memoize(timeout=300)
+def get_resource_utilization(start_date, end_date):
+    now = datetime.now()
+    overlap_days = (
+        func.julianday(func.min(EventResourceAllocation.end_time, end_date)) -
+        func.julianday(func.max(EventResourceAllocation.start_time, start_date))
+    )
+    upcoming = aliased(EventResourceAllocation)
+    upcoming_count = select(func.count(upcoming.id)).where(
+        upcoming.resource_id == Resource.id,
+        upcoming.start_time > now
+    ).correlate(Resource).scalar_subquery()
+    rows = db.session.query(
+        Resource, func.coalesce(func.sum(overlap_days * 24), 0), upcoming_count
+    ).outerjoin(EventResourceAllocation, and_(
+        EventResourceAllocation.resource_id == Resource.id,
+        EventResourceAllocation.start_time < end_date,
+        EventResourceAllocation.end_time > start_date
+    )).group_by(Resource.id).order_by(Resource.id).all()
+    upcoming_bookings = get_upcoming_bookings(now)
+    window_hours = (end_date - start_date).total_seconds() / 3600
+    return [
+        {
+            'resource': resource,
+            'total_hours': round(total_hours, 2),
+            'utilization_percent': (round(total_hours, 2) / window_hours) * 100 if window_hours else 0,
+            'upcoming_bookings': upcoming_bookings.get(resource.id, []),
+            'upcoming_count': count,
+            'all_time_hours': round(resource.total_booked_seconds / 3600, 2)
+        }
+        for resource, total_hours, count in rows
+    ]
+
+def invalidate_caches():
+    cache.delete('dashboard')
+    cache.delete_memoized(get_all_conflicts)
+    cache.delete_memoized(get_resource_utilization)
+
 @app.route('/')
+@cache.cached(timeout=60, key_prefix='dashboard', unless=lambda: bool(session.get('_flashes')))
 def index():
-    events_count = Event.query.count()
-    resources_count = Resource.query.count()
-    recent_events = Event.query.order_by(Event.start_time.desc()).limit(5).all()
+    stats = get_dashboard_stats()
+    recent_events = Event.query.options(load_event_allocations).order_by(
+        Event.start_time.desc()
+    ).limit(5).all()
     return render_template(
         'base.html',
-        events_count=events_count,
-        resources_count=resources_count,
+        events_count=stats.events_count,
+        resources_count=stats.resources_count,
         recent_events=recent_events,
+        conflicts_count=stats.conflicts_count,
         is_home=True
     )
 
 @app.route('/events')
 def events():
-    all_events = Event.query.order_by(Event.start_time).all()
-    return render_template('events.html', events=all_events)
+    all_events, allocations = load_event_listing()
+    return render_template('events.html', events=all_events, allocations=allocations)
 
 @app.route('/events/add', methods=['GET', 'POST'])
 def add_event():
     if request.method == 'POST':
-        title = request.form.get('title', '').strip()
-        description = request.form.get('description', '').strip()
-        start_time_str = request.form.get('start_time', '')
-        end_time_str = request.form.get('end_time', '')
-        if not title or not start_time_str or not end_time_str:
-            flash('Please fill in all required fields.', 'danger')
+        status, data = _parse_event_form(request.form)
+        if status == 'error':
+            flash(data, 'danger')
             return render_template('add_event.html')
-        try:
-            start_time = datetime.fromisoformat(start_time_str)
-            end_time = datetime.fromisoformat(end_time_str)
-        except ValueError:
-            flash('Invalid date/time format.', 'danger')
-            return render_template('add_event.html')
-        is_valid, error_msg = validate_event_times(start_time, end_time)
-        if not is_valid:
-            flash(error_msg, 'danger')
-            return render_template('add_event.html')
-        event = Event(
-            title=title,
-            description=description,
-            start_time=start_time,
-            end_time=end_time
-        )
+        event = Event(**data)
         db.session.add(event)
         db.session.commit()
-        flash(f'Event "{title}" created successfully!', 'success')
+        invalidate_caches()
+        flash(f'Event "{event.title}" created successfully!', 'success')
         return redirect(url_for('events'))
     return render_template('add_event.html')
 
 @app.route('/events/edit/<int:id>', methods=['GET', 'POST'])
 def edit_event(id):
-    event = Event.query.get_or_404(id)
+    event = db.one_or_404(db.select(Event).options(load_event_allocations).filter_by(id=id))
     if request.method == 'POST':
-        title = request.form.get('title', '').strip()
-        description = request.form.get('description', '').strip()
-        start_time_str = request.form.get('start_time', '')
-        end_time_str = request.form.get('end_time', '')
-        if not title or not start_time_str or not end_time_str:
-            flash('Please fill in all required fields.', 'danger')
-            return render_template('edit_event.html', event=event)
-        try:
-            start_time = datetime.fromisoformat(start_time_str)
-            end_time = datetime.fromisoformat(end_time_str)
-        except ValueError:
-            flash('Invalid date/time format.', 'danger')
-            return render_template('edit_event.html', event=event)
-        is_valid, error_msg = validate_event_times(start_time, end_time)
-        if not is_valid:
-            flash(error_msg, 'danger')
+        status, data = _parse_event_form(request.form)
+        if status == 'error':
+            flash(data, 'danger')
             return render_template('edit_event.html', event=event)
+        start_time, end_time = data['start_time'], data['end_time']
         if start_time != event.start_time or end_time != event.end_time:
-            conflict_resources = []
-            for allocation in event.allocations:
-                conflicts = check_resource_conflict(
-                    allocation.resource_id,
+            resource_ids = [allocation.resource_id for allocation in event.allocations]
+            if has_resource_conflict(resource_ids, start_time, end_time, exclude_event_id=event.id):
+                conflicts = check_resource_conflicts_bulk(
+                    resource_ids,
                     start_time,
                     end_time,
                     exclude_event_id=event.id
                 )
-                if conflicts:
-                    conflict_resources.append({
+                conflict_resources = [
+                    {
                         'resource': allocation.resource,
-                        'conflicting_events': conflicts
-                    })
-            if conflict_resources:
+                        'conflicting_events': conflicts[allocation.resource_id]
+                    }
+                    for allocation in event.allocations
+                    if allocation.resource_id in conflicts
+                ]
                 error_msg = "Cannot update event times.<br>"
                 for cr in conflict_resources:
                     names = ', '.join([e.title for e in cr['conflicting_events']])
                     error_msg += f"<strong>{cr['resource'].name}</strong> conflicts with: {names}<br>"
                 flash(error_msg, 'danger')
                 return render_template('edit_event.html', event=event)
-        event.title = title
-        event.description = description
+            EventResourceAllocation.query.filter_by(event_id=event.id).update({
+                'start_time': start_time,
+                'end_time': end_time
+            })
+        event.title = data['title']
+        event.description = data['description']
         event.start_time = start_time
         event.end_time = end_time
         db.session.commit()
-        flash(f'Event "{title}" updated successfully!', 'success')
+        invalidate_caches()
+        flash(f'Event "{event.title}" updated successfully!', 'success')
         return redirect(url_for('events'))
     return render_template('edit_event.html', event=event)
 
@@ -176,12 +367,13 @@ def delete_event(id):
     title = event.title
     db.session.delete(event)
     db.session.commit()
+    invalidate_caches()
     flash(f'Event "{title}" deleted successfully!', 'success')
     return redirect(url_for('events'))
 
 @app.route('/resources')
 def resources():
-    all_resources = Resource.query.order_by(Resource.type, Resource.name).all()
+    all_resources = load_resource_listing()
     return render_template('resources.html', resources=all_resources)
 
 @app.route('/resources/add', methods=['GET', 'POST'])
@@ -198,6 +390,7 @@ def add_resource():
         resource = Resource(name=name, type=resource_type)
         db.session.add(resource)
         db.session.commit()
+        invalidate_caches()
         flash(f'Resource "{name}" created successfully!', 'success')
         return redirect(url_for('resources'))
     return render_template('add_resource.html')
@@ -217,6 +410,7 @@ def edit_resource(id):
         resource.name = name
         resource.type = resource_type
         db.session.commit()
+        invalidate_caches()
         flash(f'Resource "{name}" updated successfully!', 'success')
         return redirect(url_for('resources'))
     return render_template('add_resource.html', resource=resource, edit_mode=True)
@@ -227,55 +421,88 @@ def delete_resource(id):
     name = resource.name
     db.session.delete(resource)
     db.session.commit()
+    invalidate_caches()
     flash(f'Resource "{name}" deleted successfully!', 'success')
     return redirect(url_for('resources'))
 
 @app.route('/allocate', methods=['GET', 'POST'])
 def allocate():
-    events = Event.query.order_by(Event.start_time).all()
-    resources = Resource.query.order_by(Resource.type, Resource.name).all()
+    events, allocations = load_event_listing()
+    resources = load_resource_listing()
     if request.method == 'POST':
         event_id = request.form.get('event_id')
         resource_ids = request.form.getlist('resource_ids')
         if not event_id or not resource_ids:
             flash('Please select event and resources.', 'danger')
-            return render_template('allocate.html', events=events, resources=resources)
-        event = Event.query.get(event_id)
-        conflicts_found = []
-        resources_to_allocate = []
-        for rid in resource_ids:
-            resource = Resource.query.get(rid)
-            if not resource:
-                continue
-            existing = EventResourceAllocation.query.filter_by(
-                event_id=event.id, resource_id=resource.id
-            ).first()
-            if existing:
-                continue
-            conflicts = check_resource_conflict(resource.id, event.start_time, event.end_time)
-            if conflicts:
-                conflicts_found.append({'resource': resource, 'conflicting_events': conflicts})
-            else:
-                resources_to_allocate.append(resource)
-        if conflicts_found:
+            return render_template('allocate.html', events=events, resources=resources,
+                           allocations=allocations)
+        event = db.session.get(Event, event_id)
+        existing_ids = {
+            row.resource_id for row in EventResourceAllocation.query.with_entities(
+                EventResourceAllocation.resource_id
+            ).filter(
+                EventResourceAllocation.event_id == event.id,
+                EventResourceAllocation.resource_id.in_(resource_ids)
+            ).all()
+        }
+        resources_to_allocate = [
+            resource for resource in Resource.query.filter(
+                Resource.id.in_(resource_ids)
+            ).order_by(Resource.id).all()
+            if resource.id not in existing_ids
+        ]
+        conflicts = iter_resource_conflicts(
+            [resource.id for resource in resources_to_allocate],
+            event.start_time,
+            event.end_time
+        )
+        if next(conflicts, None) is not None:
             flash('Conflict detected. Allocation aborted.', 'danger')
-            return render_template('allocate.html', events=events, resources=resources)
-        for resource in resources_to_allocate:
-            db.session.add(EventResourceAllocation(event_id=event.id, resource_id=resource.id))
+            return render_template('allocate.html', events=events, resources=resources,
+                           allocations=allocations)
+        if resources_to_allocate:
+            db.session.execute(db.insert(EventResourceAllocation), [
+                {
+                    'event_id': event.id,
+                    'resource_id': resource.id,
+                    'start_time': event.start_time,
+                    'end_time': event.end_time
+                }
+                for resource in resources_to_allocate
+            ])
+        # Bulk inserts skip mapper events, so update aggregates here.
+        refresh_conflicts_count(db.session.connection())
+        extend_longest_booking(
+            db.session.connection(),
+            [resource.id for resource in resources_to_allocate],
+            event.start_time,
+            event.end_time
+        )
+        add_booked_seconds(
+            db.session.connection(),
+            [resource.id for resource in resources_to_allocate],
+            booked_seconds(event.start_time, event.end_time)
+        )
         db.session.commit()
+        invalidate_caches()
         flash('Resources allocated successfully!', 'success')
         return redirect(url_for('allocate'))
-    return render_template('allocate.html', events=events, resources=resources)
+    return render_template('allocate.html', events=events, resources=resources,
+                           allocations=allocations)
 
 @app.route('/deallocate/<int:allocation_id>', methods=['POST'])
 def deallocate(allocation_id):
     allocation = EventResourceAllocation.query.get_or_404(allocation_id)
     db.session.delete(allocation)
     db.session.commit()
+    invalidate_caches()
     flash('Allocation removed successfully.', 'success')
     return redirect(url_for('allocate'))
 
-
+@app.route('/conflicts')
+def conflicts():
+    all_conflicts = get_all_conflicts()
+    return render_template('conflicts.html', conflicts=all_conflicts)
 
 @app.route('/report', methods=['GET', 'POST'])
 def report():
@@ -283,21 +510,70 @@ def report():
     start_date = None
     end_date = None
     if request.method == 'POST':
-        start_date = datetime.fromisoformat(request.form.get('start_date'))
-        end_date = datetime.fromisoformat(request.form.get('end_date')).replace(hour=23, minute=59, second=59)
-        resources = Resource.query.all()
-        utilization_data = []
-        for resource in resources:
-            util = get_resource_utilization(resource, start_date, end_date)
-            total_hours = (end_date - start_date).total_seconds() / 3600
-            util['utilization_percent'] = (util['total_hours'] / total_hours) * 100 if total_hours else 0
-            utilization_data.append(util)
+        start_date = parse_dt(request.form.get('start_date'))
+        end_date = parse_dt(request.form.get('end_date')).replace(hour=23, minute=59, second=59)
+        utilization_data = get_resource_utilization(start_date, end_date)
     return render_template('report.html', utilization_data=utilization_data,
-                           start_date=start_date, end_date=end_date)
+                           start_date=start_date, end_date=end_date,
+                           upcoming_limit=UPCOMING_BOOKINGS_LIMIT)
+
+def upgrade_db():
+    # create_all() never alters existing tables, so add the columns that
+    # were introduced after the database was created.
+    inspector = inspect(db.engine)
+    preparer = db.engine.dialect.identifier_preparer
+    with db.engine.begin() as connection:
+        for table in db.metadata.sorted_tables:
+            existing = {column['name'] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in existing:
+                    continue
+                ddl = (f'ALTER TABLE {preparer.format_table(table)} '
+                       f'ADD COLUMN {preparer.format_column(column)} '
+                       f'{column.type.compile(db.engine.dialect)}')
+                # SQLite only accepts NOT NULL on added columns with a default.
+                if column.default is not None and column.default.is_scalar:
+                    ddl += f' NOT NULL DEFAULT {column.default.arg!r}'
+                connection.execute(text(ddl))
+        # Allocations from before the times were denormalized copy their event's.
+        allocations = EventResourceAllocation.__table__
+        events = Event.__table__
+        event_row = events.c.id == allocations.c.event_id
+        connection.execute(update(allocations).where(allocations.c.start_time.is_(None)).values(
+            start_time=select(events.c.start_time).where(event_row).scalar_subquery(),
+            end_time=select(events.c.end_time).where(event_row).scalar_subquery()
+        ))
+        # SQLite can't alter constraints, so rebuild the allocation table if
+        # its foreign keys predate ON DELETE CASCADE. Orphaned rows are dropped.
+        foreign_keys = inspector.get_foreign_keys(allocations.name)
+        if any(fk['options'].get('ondelete') != 'CASCADE' for fk in foreign_keys):
+            table = preparer.format_table(allocations)
+            old_table = preparer.quote(f'_old_{allocations.name}')
+            columns = ', '.join(preparer.format_column(column) for column in allocations.columns)
+            connection.execute(text(f'ALTER TABLE {table} RENAME TO {old_table}'))
+            for index in inspector.get_indexes(allocations.name):
+                connection.execute(text(f'DROP INDEX {preparer.quote(index["name"])}'))
+            allocations.create(connection)
+            connection.execute(text(
+                f'INSERT INTO {table} ({columns}) SELECT {columns} FROM {old_table} '
+                f'WHERE event_id IN (SELECT id FROM events) '
+                f'AND resource_id IN (SELECT id FROM resources)'
+            ))
+            connection.execute(text(f'DROP TABLE {old_table}'))
 
 def init_db():
     with app.app_context():
         db.create_all()
+        upgrade_db()
+        # create_all() skips the indexes of tables that already exist.
+        for table in db.metadata.sorted_tables:
+            for index in table.indexes:
+                index.create(db.engine, checkfirst=True)
+        # Both are maintained incrementally on write; rebuild them in case
+        # rows were written around the mapper listeners.
+        with db.engine.begin() as connection:
+            rebuild_booking_aggregates(connection)
+        refresh_dashboard_stats()
 
 if __name__ == '__main__':
     init_db()
@@ -5,15 +5,35 @@ This module defines the SQLAlchemy ORM models for:
 - Event: Represents scheduled events with time windows
 - Resource: Represents bookable resources (rooms, instructors, equipment)
 - EventResourceAllocation: Many-to-many relationship between events and resources
+- DashboardStats: Cached counts shown on the dashboard, kept current by
+  mapper event listeners
 """
 
 from flask_sqlalchemy import SQLAlchemy
 from datetime import datetime
+import math
+import sqlite3
+from sqlalchemy import and_, bindparam, event, func, inspect, or_, select, update
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import aliased
 
 # Initialize SQLAlchemy instance
 db = SQLAlchemy()
 
 
+@event.listens_for(Engine, 'connect')
+def _set_sqlite_pragmas(dbapi_connection, connection_record):
+    """Use WAL so writers don't block readers, and enforce foreign keys for ON DELETE CASCADE."""
+    if isinstance(dbapi_connection, sqlite3.Connection):
+        cursor = dbapi_connection.cursor()
+        cursor.execute('PRAGMA journal_mode=WAL')
+        cursor.execute('PRAGMA synchronous=NORMAL')
+        cursor.execute('PRAGMA temp_store=MEMORY')
+        cursor.execute('PRAGMA mmap_size=268435456')
+        cursor.execute('PRAGMA foreign_keys=ON')
+        cursor.close()
+
+
 class Event(db.Model):
     """
     Event Model - Represents a scheduled event.
@@ -33,10 +53,15 @@ class Event(db.Model):
     end_time = db.Column(db.DateTime, nullable=False)
     description = db.Column(db.Text, nullable=True)
     
+    __table_args__ = (
+        db.Index('ix_event_times', 'start_time', 'end_time'),
+    )
+    
     # Relationship to allocations (one-to-many)
     allocations = db.relationship('EventResourceAllocation', 
                                    back_populates='event',
-                                   cascade='all, delete-orphan')
+                                   cascade='all, delete-orphan',
+                                   passive_deletes=True)
     
     def __repr__(self):
         return f'<Event {self.title}>'
@@ -55,6 +80,8 @@ class Resource(db.Model):
         id: Primary key
         name: Resource name
         type: Resource type (room, instructor, equipment)
+        longest_booking_seconds: Upper bound on the duration of any booking
+        total_booked_seconds: Running total of all booked time
     """
     __tablename__ = 'resources'
     
@@ -62,10 +89,18 @@ class Resource(db.Model):
     name = db.Column(db.String(200), nullable=False)
     type = db.Column(db.String(50), nullable=False)  # 'room', 'instructor', 'equipment'
     
+    # Interval-tree style augmentation: a booking overlapping [s, e) must
+    # start after s - longest_booking_seconds, which bounds the index scan.
+    longest_booking_seconds = db.Column(db.Integer, nullable=False, default=0)
+    
+    # All-time booked duration, maintained on write so reports needn't sum it.
+    total_booked_seconds = db.Column(db.BigInteger, nullable=False, default=0)
+    
     # Relationship to allocations (one-to-many)
     allocations = db.relationship('EventResourceAllocation', 
                                    back_populates='resource',
-                                   cascade='all, delete-orphan')
+                                   cascade='all, delete-orphan',
+                                   passive_deletes=True)
     
     def __repr__(self):
         return f'<Resource {self.name} ({self.type})>'
@@ -83,12 +118,18 @@ class EventResourceAllocation(db.Model):
         id: Primary key
         event_id: Foreign key to events table
         resource_id: Foreign key to resources table
+        start_time: Copy of the event's start datetime
+        end_time: Copy of the event's end datetime
     """
     __tablename__ = 'event_resource_allocations'
     
     id = db.Column(db.Integer, primary_key=True)
-    event_id = db.Column(db.Integer, db.ForeignKey('events.id'), nullable=False)
-    resource_id = db.Column(db.Integer, db.ForeignKey('resources.id'), nullable=False)
+    event_id = db.Column(db.Integer, db.ForeignKey('events.id', ondelete='CASCADE'), nullable=False)
+    resource_id = db.Column(db.Integer, db.ForeignKey('resources.id', ondelete='CASCADE'), nullable=False)
+    
+    # Event times denormalized so conflict checks are an index range scan
+    start_time = db.Column(db.DateTime, nullable=False)
+    end_time = db.Column(db.DateTime, nullable=False)
     
     # Relationships back to parent tables
     event = db.relationship('Event', back_populates='allocations')
@@ -97,7 +138,177 @@ class EventResourceAllocation(db.Model):
     # Unique constraint to prevent duplicate allocations
     __table_args__ = (
         db.UniqueConstraint('event_id', 'resource_id', name='unique_event_resource'),
+        db.Index('ix_alloc_res_start', 'resource_id', 'start_time', 'end_time'),
+        db.Index('ix_era_resource_event', 'resource_id', 'event_id'),
     )
     
     def __repr__(self):
         return f'<Allocation Event:{self.event_id} Resource:{self.resource_id}>'
+
+
+class DashboardStats(db.Model):
+    """
+    DashboardStats Model - Single-row table of dashboard aggregates.
+    
+    The counts are maintained by the listeners below whenever events,
+    resources or allocations are written, so the dashboard reads one row
+    instead of counting tables and scanning for conflicts.
+    
+    Attributes:
+        id: Primary key (always 1)
+        events_count: Number of events
+        resources_count: Number of resources
+        conflicts_count: Number of overlapping allocation pairs
+    """
+    __tablename__ = 'dashboard_stats'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    events_count = db.Column(db.Integer, nullable=False, default=0)
+    resources_count = db.Column(db.Integer, nullable=False, default=0)
+    conflicts_count = db.Column(db.Integer, nullable=False, default=0)
+    
+    def __repr__(self):
+        return f'<DashboardStats events:{self.events_count} conflicts:{self.conflicts_count}>'
+
+
+def count_conflicts_query():
+    """Select counting overlapping allocation pairs on the same resource."""
+    first = aliased(EventResourceAllocation)
+    second = aliased(EventResourceAllocation)
+    # Each pair is counted once, from the booking that starts first (ties
+    # broken by id), so second is a range scan of ix_alloc_res_start.
+    return select(func.count()).select_from(first).join(second, and_(
+        second.resource_id == first.resource_id,
+        second.start_time >= first.start_time,
+        second.start_time < first.end_time,
+        or_(second.start_time > first.start_time, second.id > first.id)
+    ))
+
+
+def _update_stats(connection, **values):
+    connection.execute(update(DashboardStats.__table__).values(**values))
+
+
+def refresh_conflicts_count(connection):
+    """Recount conflicts; call after writes that bypass mapper events."""
+    _update_stats(connection, conflicts_count=count_conflicts_query().scalar_subquery())
+
+
+def extend_longest_booking(connection, resource_ids, start_time, end_time):
+    """Raise resources' longest booking bound; call after writes that bypass mapper events."""
+    seconds = math.ceil((end_time - start_time).total_seconds())
+    resources = Resource.__table__
+    connection.execute(update(resources).where(resources.c.id.in_(resource_ids)).values(
+        longest_booking_seconds=func.max(resources.c.longest_booking_seconds, seconds)
+    ))
+
+
+def rebuild_booking_aggregates(connection):
+    """Recompute resources' longest booking bound and booked total from their allocations."""
+    allocations = EventResourceAllocation.__table__
+    aggregates = {}
+    for resource_id, start_time, end_time in connection.execute(select(
+        allocations.c.resource_id, allocations.c.start_time, allocations.c.end_time
+    )):
+        longest, total = aggregates.get(resource_id, (0, 0))
+        aggregates[resource_id] = (
+            max(longest, math.ceil((end_time - start_time).total_seconds())),
+            total + booked_seconds(start_time, end_time)
+        )
+    resources = Resource.__table__
+    connection.execute(update(resources).values(longest_booking_seconds=0, total_booked_seconds=0))
+    if aggregates:
+        connection.execute(
+            update(resources).where(resources.c.id == bindparam('b_id')).values(
+                longest_booking_seconds=bindparam('b_longest'),
+                total_booked_seconds=bindparam('b_total')
+            ),
+            [
+                {'b_id': resource_id, 'b_longest': longest, 'b_total': total}
+                for resource_id, (longest, total) in aggregates.items()
+            ]
+        )
+
+
+def add_booked_seconds(connection, resource_ids, seconds):
+    """Adjust resources' booked totals; call after writes that bypass mapper events."""
+    resources = Resource.__table__
+    connection.execute(update(resources).where(resources.c.id.in_(resource_ids)).values(
+        total_booked_seconds=resources.c.total_booked_seconds + seconds
+    ))
+
+
+def booked_seconds(start_time, end_time):
+    return round((end_time - start_time).total_seconds())
+
+
+def _previous_value(attr):
+    history = attr.history
+    return history.deleted[0] if history.deleted else attr.value
+
+
+@event.listens_for(Event, 'after_insert')
+def _event_inserted(mapper, connection, target):
+    _update_stats(connection, events_count=DashboardStats.events_count + 1)
+
+
+@event.listens_for(Event, 'after_update')
+def _event_updated(mapper, connection, target):
+    state = inspect(target)
+    if state.attrs.start_time.history.has_changes() or state.attrs.end_time.history.has_changes():
+        refresh_conflicts_count(connection)
+        resource_ids = select(EventResourceAllocation.resource_id).where(
+            EventResourceAllocation.event_id == target.id
+        )
+        extend_longest_booking(connection, resource_ids, target.start_time, target.end_time)
+        previous_seconds = booked_seconds(
+            _previous_value(state.attrs.start_time), _previous_value(state.attrs.end_time)
+        )
+        add_booked_seconds(
+            connection, resource_ids,
+            booked_seconds(target.start_time, target.end_time) - previous_seconds
+        )
+
+
+@event.listens_for(Event, 'before_delete')
+def _event_deleting(mapper, connection, target):
+    # Allocations still present here are removed by ON DELETE CASCADE, which
+    # skips the allocation listeners; loaded ones were already deleted.
+    resource_ids = select(EventResourceAllocation.resource_id).where(
+        EventResourceAllocation.event_id == target.id
+    )
+    add_booked_seconds(connection, resource_ids, -booked_seconds(target.start_time, target.end_time))
+
+
+@event.listens_for(Event, 'after_delete')
+def _event_deleted(mapper, connection, target):
+    _update_stats(connection, events_count=DashboardStats.events_count - 1)
+    refresh_conflicts_count(connection)
+
+
+@event.listens_for(Resource, 'after_insert')
+def _resource_inserted(mapper, connection, target):
+    _update_stats(connection, resources_count=DashboardStats.resources_count + 1)
+
+
+@event.listens_for(Resource, 'after_delete')
+def _resource_deleted(mapper, connection, target):
+    _update_stats(connection, resources_count=DashboardStats.resources_count - 1)
+    refresh_conflicts_count(connection)
+
+
+@event.listens_for(EventResourceAllocation, 'after_insert')
+def _allocation_inserted(mapper, connection, target):
+    refresh_conflicts_count(connection)
+    extend_longest_booking(connection, [target.resource_id], target.start_time, target.end_time)
+    add_booked_seconds(
+        connection, [target.resource_id], booked_seconds(target.start_time, target.end_time)
+    )
+
+
+@event.listens_for(EventResourceAllocation, 'after_delete')
+def _allocation_deleted(mapper, connection, target):
+    refresh_conflicts_count(connection)
+    add_booked_seconds(
+        connection, [target.resource_id], -booked_seconds(target.start_time, target.end_time)
+    )